@@ -26,9 +26,9 @@ Output:
 Author: Chakshu Project
 """
 
-import json
-from collections import Counter
+import numpy as np
 
+from src.coco import load_coco
 from src.constants import IMG, ANNOTATIONS_PATH
 
 
@@ -54,7 +54,8 @@ def inspect_coco_dataset(json_path, image_dir):
             - categories (dict): Mapping of category_id -> category_name
     
     Prints:
-        - Complete class distribution showing all categories and their instance counts
+        - Complete class distribution showing all categories and their instance counts,
+          sorted by count (descending)
         - Warning list of unwanted classes (animals) that should be filtered
     
     Example:
@@ -67,30 +68,31 @@ def inspect_coco_dataset(json_path, image_dir):
         [WARNING] dog: 5508 instances (FILTER THIS)
         [WARNING] cat: 4768 instances (FILTER THIS)
     """
-    # Load COCO annotations
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    # Load COCO annotations (parsed once, then served from the pickle sidecar)
+    data = load_coco(json_path)
 
     # Build category mapping: category_id -> category_name
     categories = {cat['id']: cat['name'] for cat in data['categories']}
     annotations = data['annotations']
+    category_ids = np.fromiter((ann['category_id'] for ann in annotations), dtype=np.int32, count=len(annotations))
 
-    # Count instances per class using Counter for efficiency
-    class_counts = Counter([ann['category_id'] for ann in annotations])
+    # Count instances per class in one vectorized pass: class_counts[cat_id] -> count
+    class_counts = np.bincount(category_ids, minlength=max(categories, default=-1) + 1)
 
-    # Display complete class distribution
+    # Display complete class distribution, most frequent class first
     print("=== Class Distribution ===")
-    for cat_id, count in class_counts.items():
-        print(f"{categories[cat_id]}: {count} instances")
+    present = np.flatnonzero(class_counts)
+    for cat_id in present[np.argsort(-class_counts[present], kind='stable')].tolist():
+        print(f"{categories[cat_id]}: {class_counts[cat_id]} instances")
 
     # Identify unwanted classes for surveillance use case
     # These are primarily animals that are not relevant for CCTV human detection
-    unwanted = ['dog', 'cat', 'bird', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe']
+    unwanted = frozenset({'dog', 'cat', 'bird', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe'})
     
     print("\n=== Unwanted Classes Present ===")
     for cat_id, name in categories.items():
         if name.lower() in unwanted:
-            count = class_counts.get(cat_id, 0)
+            count = class_counts[cat_id]
             print(f"[WARNING] {name}: {count} instances (FILTER THIS)")
 
     return data, categories
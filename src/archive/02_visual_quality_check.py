@@ -40,13 +40,43 @@ Author: Chakshu Project
 """
 
 import os
-import json
 import random
+from collections import defaultdict
+from functools import lru_cache
 
 import cv2
 import matplotlib.pyplot as plt
+import numpy as np
+from src.coco import load_coco
 from src.constants import IMG, ANNOTATIONS_PATH
 
+# Drawing style for boxes and labels (RGB, since images are converted for matplotlib)
+BOX_COLOR = (0, 255, 0)
+BOX_THICKNESS = 2
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.9
+
+
+@lru_cache(maxsize=64)
+def _load_rgb(img_path, mtime_ns):
+    """
+    Load an image as RGB, cached in memory for the current process.
+    
+    The cache only helps when visualize_random_samples is called repeatedly in one
+    session (e.g. a notebook) and draws an image again; a single script run decodes
+    every image once. mtime_ns is part of the cache key only, so a file changed on
+    disk is reloaded.
+    The cached array is shared: callers must copy it before drawing on it.
+    
+    Returns:
+        np.ndarray | None: RGB image, or None if it cannot be read
+    """
+    img = cv2.imread(img_path)
+    if img is None:
+        return None
+    # Convert BGR (OpenCV) to RGB (matplotlib)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
 
 def visualize_random_samples(data, categories, image_dir, num_samples=5):
     """
@@ -91,8 +121,7 @@ def visualize_random_samples(data, categories, image_dir, num_samples=5):
     
     Example:
         >>> # Load COCO data
-        >>> with open('annotations.json') as f:
-        ...     data = json.load(f)
+        >>> data = load_coco('annotations.json')
         >>> categories = {cat['id']: cat['name'] for cat in data['categories']}
         >>> 
         >>> # Visualize 10 random samples
@@ -107,50 +136,61 @@ def visualize_random_samples(data, categories, image_dir, num_samples=5):
     """
     # Define surveillance-relevant categories
     target_categories = ['person', 'car', 'truck', 'bus', 'motorcycle']
-    target_cat_ids = [cat['id'] for cat in data['categories']
-                      if cat['name'] in target_categories]
+    target_cat_ids = {cat['id'] for cat in data['categories']
+                      if cat['name'] in target_categories}
 
-    # Find all images that have at least one target annotation
-    target_image_ids = set()
+    # Index images by id and target annotations by image id in one pass,
+    # so each sampled image is an O(1) lookup instead of a full dataset scan
+    images_by_id = {img['id']: img for img in data['images']}
+    anns_by_image_id = defaultdict(list)
     for ann in data['annotations']:
         if ann['category_id'] in target_cat_ids:
-            target_image_ids.add(ann['image_id'])
-    
-    # Convert to list and randomly sample images
-    target_image_ids = list(target_image_ids)
+            anns_by_image_id[ann['image_id']].append(ann)
+
+    # Every indexed image has at least one target annotation; randomly sample them
+    target_image_ids = list(anns_by_image_id.keys())
     sample_image_ids = random.sample(target_image_ids, min(num_samples, len(target_image_ids)))
 
     # Process each sampled image
     for img_id in sample_image_ids:
         # Get image metadata
-        img_info = next(img for img in data['images'] if img['id'] == img_id)
+        img_info = images_by_id[img_id]
         img_path = os.path.join(image_dir, img_info['file_name'])
 
-        # Load image from disk
-        img = cv2.imread(img_path)
+        # Load image from disk (or the decode cache if unchanged since last time)
+        try:
+            img = _load_rgb(img_path, os.stat(img_path).st_mtime_ns)
+        except OSError:
+            img = None
         if img is None:
             print(f"Warning: Could not load image {img_path}")
             continue
-        # Convert BGR (OpenCV) to RGB (matplotlib)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        # Boxes are drawn in place, so work on a copy of the cached image
+        img = img.copy()
 
         # Get ALL annotations for this image (filtered by target categories)
-        img_annotations = [ann for ann in data['annotations'] 
-                          if ann['image_id'] == img_id and ann['category_id'] in target_cat_ids]
-
-        # Draw all bounding boxes and labels
-        for ann in img_annotations:
-            # Extract bounding box coordinates
-            # COCO format: [x, y, width, height] where (x,y) is top-left corner
-            x, y, w, h = map(int, ann['bbox'])
-            
-            # Draw green rectangle (2px thick)
-            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-            # Add category label above the box
+        img_annotations = anns_by_image_id[img_id]
+
+        # Extract bounding box coordinates
+        # COCO format: [x, y, width, height] where (x,y) is top-left corner
+        bboxes = np.array([ann['bbox'] for ann in img_annotations]).astype(np.int32)
+        x, y, w, h = bboxes.T
+
+        # Draw all green rectangles (2px thick) in a single OpenCV call,
+        # one closed 4-point contour per box: (K, 4, 2)
+        contours = np.stack([
+            np.column_stack([x, y]),
+            np.column_stack([x + w, y]),
+            np.column_stack([x + w, y + h]),
+            np.column_stack([x, y + h]),
+        ], axis=1)
+        cv2.polylines(img, contours, isClosed=True, color=BOX_COLOR, thickness=BOX_THICKNESS)
+
+        # Add category label above each box (OpenCV has no batched text API)
+        for ann, label_x, label_y in zip(img_annotations, x.tolist(), y.tolist()):
             cat_name = categories[ann['category_id']]
-            cv2.putText(img, cat_name, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                        0.9, (0, 255, 0), 2)
+            cv2.putText(img, cat_name, (label_x, label_y - 10), LABEL_FONT,
+                        LABEL_SCALE, BOX_COLOR, BOX_THICKNESS)
 
         # Display the annotated image
         plt.figure(figsize=(12, 10))
@@ -163,8 +203,7 @@ def visualize_random_samples(data, categories, image_dir, num_samples=5):
 # Script entry point
 if __name__ == '__main__':
     # Load COCO annotations from constants
-    with open(ANNOTATIONS_PATH, 'r') as f:
-        data = json.load(f)
+    data = load_coco(ANNOTATIONS_PATH)
     
     # Build category mapping: category_id -> category_name
     categories = {cat['id']: cat['name'] for cat in data['categories']}
@@ -14,13 +14,17 @@ Purpose:
 Key Features:
     - **Parallel Processing**: Uses multiprocessing to leverage all CPU cores
     - **Rich Progress Bar**: Beautiful real-time progress visualization with ETA
-    - **Live Status Updates**: Shows current image path being processed
     - **Comprehensive Checks**: Multiple quality metrics per image
+    - **Incremental Runs**: Per-image measurements are cached in .cache/image_stats.parquet
+      and only re-measured when the file's mtime or size changes
     - **Detailed Reports**: Categorized issues with specific file references
 
 Performance:
     - Automatically detects CPU cores (found: 24 cores on this system)
     - Processes images in parallel batches for maximum throughput
+    - Each worker reads image files on a small thread pool while it decodes,
+      so disk I/O overlaps with compute
+    - Files are read in inode order, which follows their on-disk layout
     - Typical speed: ~100-500 images/second depending on image size
 
 Usage:
@@ -33,7 +37,6 @@ Usage:
 
 Output:
     - Beautiful progress bar with percentage, speed, and time remaining
-    - Live updates showing current image path being processed
     - Summary report showing counts for each issue type
     - Returns dictionary with categorized issues for further analysis
 
@@ -46,121 +49,266 @@ Quality Checks Performed:
 Author: Chakshu Project
 """
 
-import json
+import gc
+import io
 import os
-import cv2
+import time
+import numpy as np
+import polars as pl
+from concurrent.futures import ThreadPoolExecutor
+from PIL import ExifTags, Image, ImageFile, ImageStat
 from multiprocessing import Pool, cpu_count
 from functools import partial
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn, TimeElapsedColumn, MofNCompleteColumn
 from rich.console import Console
-from src.constants import IMG, ANNOTATIONS_PATH
+from src.coco import annotation_arrays, atomic_write, image_rows, load_coco
+from src.constants import IMG, ANNOTATIONS_PATH, CACHE_DIR
 
 console = Console()
 
+# Per-image measurements from earlier runs, reused while the file is unchanged
+STATS_CACHE_PATH = CACHE_DIR / "image_stats.parquet"
+STATS_CACHE_SCHEMA = {
+    'img_path': pl.String,
+    'mtime_ns': pl.Int64,
+    'size': pl.Int64,
+    'width': pl.Int32,
+    'height': pl.Int32,
+    'brightness': pl.Float64,
+}
 
-def process_single_image(img_info_with_anns):
+# Images sent to a worker per task; the worker reads the whole batch ahead of decoding.
+# Large batches amortize IPC and keep progress updates to one per batch.
+BATCH_SIZE = 256
+# Threads per worker process that read image files while the worker decodes
+IO_THREADS_PER_WORKER = 4
+
+# Per-worker I/O thread pool, created by _init_worker inside each pool process
+_io_pool = None
+
+
+# EXIF orientations that rotate the image by 90 degrees, swapping width and height
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _init_worker():
+    """
+    Set up a worker process (multiprocessing.Pool initializer).
+    
+    Creates the worker's I/O thread pool, and lets Pillow decode truncated JPEGs the way
+    cv2.imread does, so a half-written file is still measured rather than dropped.
+    """
+    global _io_pool
+    _io_pool = ThreadPoolExecutor(max_workers=IO_THREADS_PER_WORKER)
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+
+def _read_image_bytes(img_path):
+    """Read an image file's raw bytes, or return None if it is missing or unreadable."""
+    try:
+        with open(img_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _mean_luma(im):
+    """
+    Mean grayscale value of a Pillow image in a single pass over its pixels.
+    
+    ImageStat reduces each band to a histogram in C, so no grayscale copy or NumPy
+    array is materialized. For colour images the ITU-R 601 luma weights (the same ones
+    as cv2.COLOR_BGR2GRAY) are applied to the per-channel means, which equals the mean
+    of the converted grayscale image.
     """
-    Process a single image to check for quality issues.
+    if im.mode not in ('L', 'RGB'):
+        im = im.convert('RGB')
+    means = ImageStat.Stat(im).mean
+    if im.mode == 'L':
+        return means[0]
+    r, g, b = means
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+
+def process_single_image(img_path, image_bytes=None):
+    """
+    Measure one image for the pixel-based quality checks.
     
     This function is designed to be called in parallel by multiprocessing.Pool.
-    It performs all quality checks on one image and returns any issues found.
+    It only measures the image; issues are derived from the measurements by
+    find_image_issues, so measurements can be cached between runs.
     
     Args:
-        img_info_with_anns (tuple): Tuple containing:
-            - img_info (dict): COCO image metadata
-            - image_dir (str): Directory path
-            - img_annotations (list): Annotations for this specific image
+        img_path (str): Full path of the image file
+        image_bytes (bytes, optional): Raw file contents, already read by the caller.
+                                       Default: None (read the file here)
     
     Returns:
-        dict: Issues found in this image, with keys:
-            - 'low_resolution': List of filenames
-            - 'poor_lighting': List of filenames
-            - 'too_small': List of dicts with image, bbox, category info
-            - 'image_name': Filename for progress tracking
-    
-    Quality Checks:
-        1. Resolution: Flags if width < 640 or height < 480
-        2. Brightness: Flags if mean grayscale value < 50 (very dark)
-        3. Object Size: Flags if bbox area < 2% of image area
+        tuple | None: (width, height, brightness) where brightness is the mean
+                      grayscale value measured on a 1/8-scale decode, or None if
+                      the image cannot be read
     
     Notes:
-        - Returns empty lists if image cannot be loaded
-        - Skips processing if image file doesn't exist
+        - Resolution is read from the file header without decoding pixels
         - Thread-safe for parallel execution
     """
-    img_info, image_dir, img_annotations = img_info_with_anns
+    if image_bytes is None:
+        image_bytes = _read_image_bytes(img_path)
     
-    issues = {
-        'low_resolution': [],
-        'poor_lighting': [],
-        'too_small': [],
-        'image_name': img_info['file_name']
-    }
+    # Skip if image doesn't exist
+    if image_bytes is None:
+        return None
     
-    img_path = os.path.join(image_dir, img_info['file_name'])
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as im:
+            # Resolution comes from the file header; no pixels are decoded for it
+            w, h = im.size
+            
+            # For brightness, let libjpeg decode straight to grayscale at 1/8 scale
+            # (DCT scaling). Non-JPEG formats ignore draft and decode normally.
+            im.draft('L', (max(w // 8, 1), max(h // 8, 1)))
+            brightness = _mean_luma(im)
+            
+            # cv2.imread applies the EXIF orientation: report the displayed size
+            if im.getexif().get(ExifTags.Base.Orientation, 1) in _ROTATED_ORIENTATIONS:
+                w, h = h, w
+    except OSError:
+        # Unreadable or corrupt image
+        return None
+    
+    return w, h, brightness
+
+
+def process_image_batch(batch):
+    """
+    Measure a batch of images, overlapping file reads with decoding.
     
-    # Skip if image doesn't exist
-    if not os.path.exists(img_path):
-        return issues
+    The worker's I/O threads read every file of the batch while the worker decodes
+    and measures the images that have already arrived, so the worker is not stalled
+    on disk for each image in turn.
     
-    # Load image
-    img = cv2.imread(img_path)
-    if img is None:
-        return issues
+    Args:
+        batch (list): Image paths
     
-    # Check resolution
-    h, w = img.shape[:2]
-    if w < 640 or h < 480:
-        issues['low_resolution'].append(img_info['file_name'])
+    Returns:
+        list: (img_path, measurement) pairs, measurement as from process_single_image
+    """
+    if _io_pool is None:
+        raw_images = map(_read_image_bytes, batch)
+    else:
+        raw_images = _io_pool.map(_read_image_bytes, batch)
+    return [(img_path, process_single_image(img_path, raw)) for img_path, raw in zip(batch, raw_images)]
+
+
+def find_too_small_objects(data, min_area_ratio=0.02):
+    """
+    Find annotated objects that cover less than 2% of their image's area.
     
-    # Check brightness (for poor lighting detection)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    brightness = gray.mean()
-    if brightness < 50:  # Very dark
-        issues['poor_lighting'].append(img_info['file_name'])
+    This check needs no pixel data: image sizes come from the COCO image metadata
+    ('width'/'height'). It therefore runs as one vectorized pass over all annotations
+    in the main process, before any image is read.
     
-    # Check bbox sizes for this image (annotations already provided)
+    Args:
+        data (dict): COCO dataset structure ('images', 'annotations', ...)
+        min_area_ratio (float, optional): Minimum bbox area as a fraction of image area.
+                                          Default: 0.02
     
-    for ann in img_annotations:
-        bbox_w, bbox_h = ann['bbox'][2], ann['bbox'][3]
-        
-        # Object is less than 2% of image area
-        if (bbox_w * bbox_h) < (w * h * 0.02):
-            issues['too_small'].append({
-                'image': img_info['file_name'],
-                'bbox': ann['bbox'],
-                'category': ann['category_id']
-            })
+    Returns:
+        list: Dicts with 'image' (filename), 'bbox' and 'category' of each too small
+              object, ordered by image as in data['images']
+    """
+    images = data['images']
+    annotations = data['annotations']
+    if not images or not annotations:
+        return []
+    
+    # float64 boxes: areas must match the per-box Python float comparison exactly
+    image_ids, _, bboxes = annotation_arrays(annotations, bbox_dtype=np.float64)
+    
+    # Row in data['images'] for every annotation; annotations pointing at images
+    # missing from the metadata are never checked
+    img_ids = np.fromiter((img['id'] for img in images), dtype=np.int64, count=len(images))
+    img_areas = np.fromiter((img['width'] * img['height'] for img in images), dtype=np.float64, count=len(images))
+    ann_img_rows, known = image_rows(img_ids, image_ids)
+    
+    # Object is less than min_area_ratio of image area
+    ann_areas = bboxes[:, 2] * bboxes[:, 3]
+    too_small = known & (ann_areas < img_areas[ann_img_rows] * min_area_ratio)
+    
+    flagged = np.flatnonzero(too_small)
+    flagged = flagged[np.argsort(ann_img_rows[flagged], kind='stable')]
+    return [
+        {
+            'image': images[img_row]['file_name'],
+            'bbox': annotations[i]['bbox'],
+            'category': annotations[i]['category_id']
+        }
+        for i, img_row in zip(flagged.tolist(), ann_img_rows[flagged].tolist())
+    ]
+
+
+def _load_stats_cache(cache_path):
+    """
+    Load cached image measurements from the parquet sidecar.
     
-    return issues
+    Returns:
+        dict: img_path -> (mtime_ns, size, width, height, brightness); empty if there
+              is no usable cache
+    """
+    if cache_path is None or not cache_path.exists():
+        return {}
+    try:
+        df = pl.read_parquet(cache_path)
+    except (OSError, pl.exceptions.PolarsError):
+        return {}
+    return {row[0]: row[1:] for row in df.rows()}
 
 
-def merge_issues(all_issues):
+def _save_stats_cache(cache_path, stats_cache):
+    """Write image measurements to the parquet sidecar."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [(img_path, *values) for img_path, values in stats_cache.items()]
+    df = pl.DataFrame(rows, schema=STATS_CACHE_SCHEMA, orient='row')
+    with atomic_write(cache_path) as tmp_path:
+        df.write_parquet(tmp_path)
+
+
+def find_image_issues(image_stats):
     """
-    Merge issues from multiple parallel workers into a single report.
+    Derive the pixel-based issues from per-image measurements.
     
     Args:
-        all_issues (list): List of issue dicts from each worker
+        image_stats (dict): file_name -> (width, height, brightness)
     
     Returns:
-        dict: Merged issues with all results combined
+        dict: Issues report with keys:
+            - 'low_resolution': Sorted filenames smaller than 640x480
+            - 'poor_lighting': Sorted filenames with mean brightness < 50 (very dark)
+            - 'too_small': Empty list, filled by the caller
+            - 'occluded': List (placeholder for future)
     """
-    merged = {
+    issues = {
         'low_resolution': [],
         'poor_lighting': [],
         'too_small': [],
         'occluded': []  # Placeholder for future
     }
     
-    for issue_dict in all_issues:
-        merged['low_resolution'].extend(issue_dict['low_resolution'])
-        merged['poor_lighting'].extend(issue_dict['poor_lighting'])
-        merged['too_small'].extend(issue_dict['too_small'])
+    for file_name, (w, h, brightness) in image_stats.items():
+        # Check resolution
+        if w < 640 or h < 480:
+            issues['low_resolution'].append(file_name)
+        
+        # Check brightness (for poor lighting detection)
+        if brightness < 50:  # Very dark
+            issues['poor_lighting'].append(file_name)
     
-    return merged
+    issues['low_resolution'].sort()
+    issues['poor_lighting'].sort()
+    return issues
 
 
-def check_data_quality(data, image_dir, num_workers=None):
+def check_data_quality(data, image_dir, num_workers=None, cache_path=STATS_CACHE_PATH):
     """
     Check COCO dataset for quality issues using parallel processing.
     
@@ -176,6 +324,9 @@ def check_data_quality(data, image_dir, num_workers=None):
         image_dir (str): Directory path containing the actual image files
         num_workers (int, optional): Number of parallel workers to use.
                                      Default: None (auto-detect CPU cores)
+        cache_path (Path, optional): Parquet file caching per-image measurements,
+                                     keyed by path, mtime and size. Default:
+                                     .cache/image_stats.parquet; None disables it
     
     Returns:
         dict: Quality issues report with keys:
@@ -189,10 +340,10 @@ def check_data_quality(data, image_dir, num_workers=None):
         - Uses multiprocessing.Pool for parallel execution
         - Typical throughput: 100-500 images/second
         - Progress updates printed every batch
+        - Images unchanged since the last run are served from the cache and not read
     
     Example:
-        >>> with open('annotations.json') as f:
-        ...     data = json.load(f)
+        >>> data = load_coco('annotations.json')
         >>> issues = check_data_quality(data, 'images/', num_workers=24)
         Processing 118287 images using 24 workers...
         Processed 10000/118287 images...
@@ -208,8 +359,10 @@ def check_data_quality(data, image_dir, num_workers=None):
         ['000000001.jpg', '000000042.jpg', ...]
     
     Notes:
-        - Pre-builds annotation lookup dict for faster parallel access
+        - Checks object sizes from metadata before any image is read
         - Each worker processes images independently (no shared state)
+        - Worker memory stays small: only paths are sent, and inherited
+          parent memory is kept shared (gc.freeze before fork)
         - Safe to interrupt with Ctrl+C
     """
     # Auto-detect CPU cores if not specified
@@ -218,69 +371,92 @@ def check_data_quality(data, image_dir, num_workers=None):
     
     console.print(f"\n[bold cyan]Processing {len(data['images'])} images using {num_workers} workers...[/bold cyan]\n")
     
-    # Pre-build annotations lookup dict
-    console.print("[yellow]Grouping annotations by image...[/yellow]")
-    annotations_dict = {}
-    
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        MofNCompleteColumn(),
-        console=console
-    ) as progress:
-        task = progress.add_task("[cyan]Indexing annotations...", total=len(data['annotations']))
-        
-        for i, ann in enumerate(data['annotations']):
-            img_id = ann['image_id']
-            if img_id not in annotations_dict:
-                annotations_dict[img_id] = []
-            annotations_dict[img_id].append(ann)
-            
-            # Update progress every 10,000 annotations
-            if (i + 1) % 10000 == 0 or (i + 1) == len(data['annotations']):
-                progress.update(task, completed=i + 1)
+    # Object sizes only need annotation and image metadata: check them all up front
+    console.print("[yellow]Checking object sizes against image metadata...[/yellow]")
+    t0 = time.perf_counter()
+    too_small = find_too_small_objects(data)
     
-    console.print("[green]✓ Annotation index built![/green]\n")
+    console.print(f"[green]✓ Found {len(too_small)} too small objects in {time.perf_counter() - t0:.2f}s![/green]\n")
     
-    # Prepare data for workers: (img_info, image_dir, annotations_for_this_image)
-    # This avoids passing the huge annotations_dict to each worker
+    # Reuse measurements of images whose file is unchanged (same mtime and size)
+    # since the last run; only the rest is sent to the workers
     console.print("[yellow]Preparing work items for parallel processing...[/yellow]")
-    work_items = []
+    t0 = time.perf_counter()
+    stats_cache = _load_stats_cache(cache_path)
+    # The next cache holds only images seen in this run, so entries for deleted or
+    # renamed files and other image directories are dropped instead of piling up
+    new_cache = {}    # img_path -> (mtime_ns, size, width, height, brightness)
+    image_stats = {}  # file_name -> (width, height, brightness)
+    pending = {}      # img_path -> (file_name, mtime_ns, size)
+    inodes = {}       # img_path -> inode number, for read ordering
     for img_info in data['images']:
-        img_id = img_info['id']
-        img_annotations = annotations_dict.get(img_id, [])
-        work_items.append((img_info, image_dir, img_annotations))
-    
-    console.print(f"[green]✓ Prepared {len(work_items)} work items![/green]\n")
-    
-    # Process images in parallel with rich progress bar
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        MofNCompleteColumn(),
-        TextColumn("•"),
-        TimeElapsedColumn(),
-        TextColumn("•"),
-        TimeRemainingColumn(),
-        console=console
-    ) as progress:
-        task = progress.add_task("[green]Starting image processing...", total=len(work_items))
+        file_name = img_info['file_name']
+        img_path = os.path.join(image_dir, file_name)
+        try:
+            st = os.stat(img_path)
+        except OSError:
+            continue  # Skip if image doesn't exist
         
-        with Pool(processes=num_workers) as pool:
-            results = []
-            # Use chunk size of 50 for good balance
-            for i, result in enumerate(pool.imap(process_single_image, work_items, chunksize=50)):
-                results.append(result)
-                # Update progress bar with current image name
-                current_img = result['image_name']
-                progress.update(task, advance=1, description=f"[green]Processing: {current_img}")
+        cached = stats_cache.get(img_path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            image_stats[file_name] = cached[2:]
+            new_cache[img_path] = cached
+        else:
+            pending[img_path] = (file_name, st.st_mtime_ns, st.st_size)
+            inodes[img_path] = st.st_ino
+    
+    # Workers only measure pixels, so they receive nothing but paths. Ordering them by
+    # inode makes consecutive batches read files that were written next to each other,
+    # turning random JPEG opens into mostly sequential disk reads.
+    work_items = sorted(pending, key=inodes.__getitem__)
+    batches = [work_items[i:i + BATCH_SIZE] for i in range(0, len(work_items), BATCH_SIZE)]
+    
+    console.print(f"[green]✓ {len(image_stats)} images unchanged since last run, "
+                  f"prepared {len(work_items)} work items in {time.perf_counter() - t0:.2f}s![/green]\n")
+    
+    if work_items:
+        # Process images in parallel with rich progress bar
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TextColumn("•"),
+            TimeElapsedColumn(),
+            TextColumn("•"),
+            TimeRemainingColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task("[green]Processing images...", total=len(work_items))
+            
+            # Forked workers inherit the parsed COCO data copy-on-write. They never use it, but
+            # a garbage collection in a worker still writes to every object's header and so
+            # copies those pages into each worker. Freezing moves all existing objects out of
+            # the collector's reach, keeping the inherited memory shared.
+            gc.freeze()
+            try:
+                with Pool(processes=num_workers, initializer=_init_worker) as pool:
+                    # Each task is a batch of BATCH_SIZE images whose files are read ahead.
+                    # Take batches as they finish so a slow image never holds back the others.
+                    for batch_results in pool.imap_unordered(process_image_batch, batches):
+                        for img_path, measurement in batch_results:
+                            if measurement is None:
+                                continue  # Unreadable: not cached, retried next run
+                            file_name, mtime_ns, size = pending[img_path]
+                            image_stats[file_name] = measurement
+                            new_cache[img_path] = (mtime_ns, size, *measurement)
+                        progress.update(task, advance=len(batch_results))
+            finally:
+                gc.unfreeze()
+    
+    if cache_path is not None and new_cache != stats_cache:
+        _save_stats_cache(cache_path, new_cache)
     
     console.print(f"\n[bold green]✓ Completed processing all {len(data['images'])} images![/bold green]\n")
     
-    # Merge results from all workers
-    issues = merge_issues(results)
+    # Derive issues from all measurements, cached and fresh
+    issues = find_image_issues(image_stats)
+    issues['too_small'] = too_small
     
     # Print summary report with rich formatting
     console.print("[bold cyan]═══ Data Quality Report ═══[/bold cyan]")
@@ -294,8 +470,7 @@ def check_data_quality(data, image_dir, num_workers=None):
 # Script entry point
 if __name__ == '__main__':
     # Load COCO annotations
-    with open(ANNOTATIONS_PATH, 'r') as f:
-        data = json.load(f)
+    data = load_coco(ANNOTATIONS_PATH)
     
     # Build category mapping (for future use)
     categories = {cat['id']: cat['name'] for cat in data['categories']}
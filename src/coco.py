@@ -0,0 +1,146 @@
+"""
+Chakshu COCO Helpers
+
+Shared loading and NumPy conversion of COCO annotations for the inspection and data
+preparation scripts, and the atomic file write used for their caches and outputs.
+"""
+
+import mmap
+import os
+import pickle
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Write a file under a temp name next to it and rename it into place on success.
+
+    Readers never see a partially written file, even if the run is interrupted: path
+    keeps either its old contents or the complete new ones. If writing fails, the temp
+    file is removed and the exception propagates.
+
+    Args:
+        path (str | Path): Destination file
+
+    Yields:
+        Path: Temp path in the same directory to write the contents to
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def load_coco(json_path):
+    """
+    Load a COCO annotations file, reusing a pickle sidecar when it is fresh.
+
+    Parsing the ~500 MB instances JSON dominates the runtime of every script that
+    needs it. The first call parses the JSON and writes the result next to it as
+    ``<name>.pkl``; later calls load that pickle instead, as long as it is newer
+    than the JSON file.
+
+    Args:
+        json_path (str | Path): Path to COCO format JSON annotation file
+
+    Returns:
+        dict: Complete COCO dataset structure ('images', 'annotations', 'categories', ...)
+    """
+    json_path = Path(json_path)
+    cache_path = json_path.with_suffix('.pkl')
+
+    if cache_path.exists() and cache_path.stat().st_mtime >= json_path.stat().st_mtime:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+
+    # orjson parses straight from the memory-mapped file, so the raw JSON is never
+    # copied into a Python bytes object first
+    with open(json_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as buf:
+            data = orjson.loads(buf)
+
+    # The sidecar lives next to the dataset, which may be read-only: then there is no cache
+    try:
+        with atomic_write(cache_path) as tmp_path, open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=5)
+    except OSError:
+        pass
+
+    return data
+
+
+def annotation_arrays(annotations, bbox_dtype=np.float32):
+    """
+    Convert COCO annotations (a list of dicts) into struct-of-arrays NumPy form.
+
+    Filters, counts and grouping over ~900k annotations then become vectorized NumPy
+    operations instead of per-annotation dict lookups. Row i of every array belongs to
+    ``annotations[i]``.
+
+    Args:
+        annotations (list): COCO annotation objects
+        bbox_dtype (np.dtype, optional): dtype of the bboxes array. Default: np.float32
+
+    Returns:
+        tuple: (image_ids, category_ids, bboxes) where:
+            - image_ids (np.ndarray): int32[N] image id of each annotation
+            - category_ids (np.ndarray): int32[N] category id of each annotation
+            - bboxes (np.ndarray): bbox_dtype[N, 4] boxes in COCO [x, y, width, height] format
+    """
+    n = len(annotations)
+    image_ids = np.fromiter((ann['image_id'] for ann in annotations), dtype=np.int32, count=n)
+    category_ids = np.fromiter((ann['category_id'] for ann in annotations), dtype=np.int32, count=n)
+    bboxes = np.array([ann['bbox'] for ann in annotations], dtype=bbox_dtype).reshape(n, 4)
+    return image_ids, category_ids, bboxes
+
+
+def group_by_image(image_ids):
+    """
+    Group annotation rows by image id with a single stable sort.
+
+    Args:
+        image_ids (np.ndarray): int[N] image id of each annotation (see annotation_arrays)
+
+    Returns:
+        dict: Mapping of image_id -> np.ndarray of annotation row indices, in their
+              original order
+    """
+    if len(image_ids) == 0:
+        return {}
+
+    order = np.argsort(image_ids, kind='stable')
+    sorted_ids = image_ids[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_ids)) + 1))
+    return dict(zip(sorted_ids[starts].tolist(), np.split(order, starts[1:])))
+
+
+def image_rows(img_ids, ann_image_ids):
+    """
+    Find the image row of every annotation with a sorted image id lookup.
+
+    Args:
+        img_ids (np.ndarray): int[M] id of each image, in image order
+        ann_image_ids (np.ndarray): int[N] image id of each annotation
+
+    Returns:
+        tuple: (rows, known) where:
+            - rows (np.ndarray): int64[N] index into img_ids for each annotation
+            - known (np.ndarray): bool[N] False for annotations whose image id is not in
+              img_ids; their rows entry is meaningless
+    """
+    if len(img_ids) == 0:
+        return np.zeros(len(ann_image_ids), dtype=np.int64), np.zeros(len(ann_image_ids), dtype=bool)
+
+    order = np.argsort(img_ids)
+    pos = np.minimum(np.searchsorted(img_ids[order], ann_image_ids), len(order) - 1)
+    rows = order[pos]
+    return rows, img_ids[rows] == ann_image_ids
@@ -1,15 +1,43 @@
 """
 Chakshu Constants
 
-Configuration for the Chakshu project (Native Ubuntu).
+Configuration for the Chakshu project. The dataset location is picked per platform
+(native Ubuntu, WSL or Windows); set CHAKSHU_VERBOSE=1 to print the selection.
 """
 
 import os
+import platform
+import sys
+from functools import lru_cache
 from pathlib import Path
 
+
+@lru_cache(maxsize=1)
+def _detect_os():
+    """
+    Detect the platform the project is running on.
+
+    Uses sys.platform and the kernel release string only, so no files are read.
+
+    Returns:
+        str: 'windows', 'wsl' or 'linux'
+    """
+    if sys.platform == 'win32':
+        return 'windows'
+    if 'microsoft' in platform.uname().release.lower():
+        return 'wsl'
+    return 'linux'
+
+
 # TODO: Update these paths after mounting
 # Defaulting to a likely mount point or placeholder
-DATA_ROOT = Path("/media/aky/Data/AIML/Data") 
+_DATA_ROOTS = {
+    'linux': Path("/media/aky/Data/AIML/Data"),
+    'wsl': Path("/mnt/f/Soft/AIML/Data"),
+    'windows': Path(r"F:\Soft\AIML\Data"),
+}
+
+DATA_ROOT = _DATA_ROOTS[_detect_os()]
 IMG = DATA_ROOT / "COCO_TD/train2017/train2017"
 ANNOTATIONS_PATH = DATA_ROOT / "COCO_TD/annotations_trainval2017/annotations/instances_train2017.json"
 
@@ -17,5 +45,9 @@ ANNOTATIONS_PATH = DATA_ROOT / "COCO_TD/annotations_trainval2017/annotations/ins
 PROJECT_ROOT = Path(__file__).parent.parent
 ARCHIVE_DIR = PROJECT_ROOT / "src" / "archive"
 INSPECTION_DIR = PROJECT_ROOT / "src" / "inspection"
+CACHE_DIR = PROJECT_ROOT / ".cache"
+
+if os.environ.get('CHAKSHU_VERBOSE'):
+    print(f"[Chakshu] Loaded {_detect_os()} constants (data root: {DATA_ROOT})")
 
 __all__ = ['IMG', 'ANNOTATIONS_PATH', 'PROJECT_ROOT']
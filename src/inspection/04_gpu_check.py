@@ -29,10 +29,14 @@ def check_gpu():
                 
                 # Test tensor operation
                 try:
-                    x = torch.rand(5, 3).to(f'cuda:{i}')
+                    # Allocate directly on the device (no CPU rand + host-to-device copy)
+                    x = torch.rand(5, 3, device=f'cuda:{i}')
                     console.print(f"  [green]Tensor allocation successful on device {i}[/green]")
-                    y = torch.rand(5, 3).to(f'cuda:{i}')
+                    y = torch.rand(5, 3, device=f'cuda:{i}')
                     z = x + y
+                    # Kernels run asynchronously: wait for them so failures surface here
+                    torch.cuda.synchronize(i)
+                    z.cpu()
                     console.print(f"  [green]Tensor addition successful on device {i}[/green]")
                 except Exception as e:
                     console.print(f"  [bold red]Tensor operation failed on device {i}: {e}[/bold red]")
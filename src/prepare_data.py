@@ -1,85 +1,235 @@
-import json
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from rich.console import Console
-from rich.progress import track
+
+import numpy as np
+from src.coco import annotation_arrays, atomic_write, group_by_image, image_rows, load_coco
 from src.constants import ANNOTATIONS_PATH, DATA_ROOT
 
-console = Console()
+# Rich costs a few hundred module imports and renders ANSI escapes on every print. Use it
+# only on a terminal; logs from scripted runs get plain text via the stand-ins below.
+_IS_TTY = sys.stdout.isatty()
 
-def convert_coco_to_yolo():
+if _IS_TTY:
+    from rich.console import Console
+    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, MofNCompleteColumn, TimeElapsedColumn
+
+
+class _PlainConsole:
+    """Stand-in for rich Console that prints messages with their markup tags removed."""
+    _MARKUP = re.compile(r"\[/?[a-z][a-z ]*\]")
+
+    def print(self, *objects):
+        print(*(self._MARKUP.sub("", str(obj)) for obj in objects), flush=True)
+
+
+class _PlainProgress:
+    """Stand-in for rich Progress that draws nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add_task(self, description, total=None):
+        return 0
+
+    def update(self, task, advance=0):
+        pass
+
+
+console = Console() if _IS_TTY else _PlainConsole()
+
+# YOLO format: class_id x_center y_center width height
+# We map person_id to class 0
+LABEL_LINE = b"0 %.6f %.6f %.6f %.6f\n"
+
+# Label files handed to a write worker per task
+WRITE_CHUNK_SIZE = 256
+
+# Normalized person boxes from the last run, valid while the annotations file is unchanged
+BOX_CACHE_NAME = "_coco_person_cache.npz"
+
+
+def _write_labels(chunk):
     """
-    Convert COCO annotations to YOLO format for 'person' class.
+    Write a chunk of label files (runs in a worker process).
+    
+    Args:
+        chunk (list): (label_file, payload) pairs, payload as ASCII bytes
+    
+    Returns:
+        int: Number of files written
     """
-    console.print(f"[bold blue]Loading annotations from {ANNOTATIONS_PATH}...[/bold blue]")
+    # Raw open/write/close: the payload is already encoded, and skipping the buffered
+    # file object avoids its extra fstat/isatty/lseek syscalls on every tiny file.
+    # Written atomically: a label with a fresh mtime is always complete, so the
+    # up-to-date check never keeps a truncated one from an interrupted run.
+    for label_file, payload in chunk:
+        with atomic_write(label_file) as tmp_path:
+            # O_BINARY (Windows only) keeps os.write from translating \n to \r\n
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+            try:
+                view = memoryview(payload)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+    return len(chunk)
+
+def _extract_person_boxes():
+    """
+    Parse the annotations and normalize every person box to YOLO format.
     
-    with open(ANNOTATIONS_PATH, 'r') as f:
-        data = json.load(f)
+    Returns:
+        tuple | None: (bboxes, img_rows, stems) where bboxes is float64[N, 4] normalized
+                      center_x, center_y, w, h, img_rows is int64[N] index of each box's
+                      image and stems holds the label file stem of every image with a
+                      person; None if the annotations have no person category or no
+                      image with a person
+    """
+    console.print(f"[bold blue]Loading annotations from {ANNOTATIONS_PATH}...[/bold blue]")
     
-    images = {img['id']: img for img in data['images']}
-    annotations = data['annotations']
-    categories = {cat['id']: cat['name'] for cat in data['categories']}
+    data = load_coco(ANNOTATIONS_PATH)
     
     # Find person category ID
-    person_id = None
-    for cat_id, name in categories.items():
-        if name == 'person':
-            person_id = cat_id
-            break
-            
+    person_id = next((cat['id'] for cat in data['categories'] if cat['name'] == 'person'), None)
+    
     if person_id is None:
         console.print("[bold red]Error: 'person' category not found![/bold red]")
-        return
+        return None
 
     console.print(f"[green]Found 'person' category ID: {person_id}[/green]")
     
+    # Keep only what the conversion needs: the person annotations, and ids, sizes and
+    # label stems (as arrays) of just the images they appear on. Dropping the parsed
+    # dataset releases the full image dicts and all non-person annotations before any
+    # labels are written.
+    annotations = [ann for ann in data['annotations'] if ann['category_id'] == person_id]
+    person_img_ids = {ann['image_id'] for ann in annotations}
+    images = [img for img in data['images'] if img['id'] in person_img_ids]
+    del data, person_img_ids
+    
+    img_ids = np.fromiter((img['id'] for img in images), dtype=np.int64, count=len(images))
+    img_wh = np.array([(img['width'], img['height']) for img in images], dtype=np.float64).reshape(-1, 2)
+    stems = [Path(img['file_name']).stem for img in images]
+    del images
+    
+    if len(img_ids) == 0:
+        console.print("[bold red]Error: no images with person annotations found![/bold red]")
+        return None
+
+    # Person boxes as one float64 array (same arithmetic as per-box Python floats)
+    image_ids, _, bboxes = annotation_arrays(annotations, bbox_dtype=np.float64)
+    del annotations
+    
+    # Image row of every annotation; annotations whose image is missing from the
+    # metadata are dropped
+    ann_img_rows, known = image_rows(img_ids, image_ids)
+    ann_img_rows, bboxes = ann_img_rows[known], bboxes[known]
+    
+    # Normalize all boxes in one pass: x, y, w, h -> center_x, center_y, w, h relative
+    # to the size of each box's image
+    wh = img_wh[ann_img_rows]
+    bboxes[:, :2] += bboxes[:, 2:] / 2
+    bboxes /= np.hstack((wh, wh))
+    
+    return bboxes, ann_img_rows, stems
+
+def _load_person_boxes(cache_path, anns_mtime_ns):
+    """
+    Load normalized person boxes from the cache, parsing the annotations if it is stale.
+    
+    Args:
+        cache_path (Path): .npz cache file
+        anns_mtime_ns (int): Modification time of the annotations file the cache must match
+    
+    Returns:
+        tuple | None: As returned by _extract_person_boxes
+    """
+    if cache_path.exists():
+        with np.load(cache_path) as cache:
+            if int(cache['anns_mtime_ns']) == anns_mtime_ns:
+                console.print(f"[green]Using cached person boxes from {cache_path}[/green]")
+                return cache['bboxes'], cache['img_rows'], cache['stems'].tolist()
+    
+    result = _extract_person_boxes()
+    if result is not None:
+        bboxes, img_rows, stems = result
+        # Saved through a file object: given a path, np.savez would append '.npz' to the temp name
+        with atomic_write(cache_path) as tmp_path, open(tmp_path, 'wb') as f:
+            np.savez(f, anns_mtime_ns=np.int64(anns_mtime_ns), bboxes=bboxes, img_rows=img_rows,
+                     stems=np.array(stems, dtype=str))
+    return result
+
+def _progress():
+    """Progress bar for the label writes: Rich on a terminal, silent otherwise."""
+    if not _IS_TTY:
+        return _PlainProgress()
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console
+    )
+
+def convert_coco_to_yolo():
+    """
+    Convert COCO annotations to YOLO format for 'person' class.
+    """
     # Create labels directory
     labels_dir = DATA_ROOT / "COCO_TD/train2017/labels"
     labels_dir.mkdir(parents=True, exist_ok=True)
     console.print(f"[blue]Labels will be saved to: {labels_dir}[/blue]")
 
-    # Process annotations
-    count = 0
+    # Reuse the boxes of the last run while the annotations file is unchanged
+    anns_mtime_ns = Path(ANNOTATIONS_PATH).stat().st_mtime_ns
+    result = _load_person_boxes(labels_dir / BOX_CACHE_NAME, anns_mtime_ns)
+    if result is None:
+        return
+    bboxes, img_rows, stems = result
     
-    # Group annotations by image
-    img_anns = {}
-    for ann in annotations:
-        if ann['category_id'] != person_id:
-            continue
-            
-        img_id = ann['image_id']
-        if img_id not in img_anns:
-            img_anns[img_id] = []
-        img_anns[img_id].append(ann)
-
-    console.print(f"[blue]Processing {len(img_anns)} images containing persons...[/blue]")
-
-    for img_id, anns in track(img_anns.items(), description="Converting..."):
-        img_info = images.get(img_id)
-        if not img_info:
-            continue
-            
-        img_w = img_info['width']
-        img_h = img_info['height']
-        file_name = Path(img_info['file_name']).stem
-        
-        label_file = labels_dir / f"{file_name}.txt"
-        
-        with open(label_file, 'w') as f:
-            for ann in anns:
-                bbox = ann['bbox'] # x, y, w, h
-                
-                # Normalize to center_x, center_y, w, h
-                x_center = (bbox[0] + bbox[2] / 2) / img_w
-                y_center = (bbox[1] + bbox[3] / 2) / img_h
-                width = bbox[2] / img_w
-                height = bbox[3] / img_h
-                
-                # YOLO format: class_id x_center y_center width height
-                # We map person_id to class 0
-                f.write(f"0 {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n")
-        
-        count += 1
+    # Group the normalized boxes by image: image row -> box indices
+    img_boxes = group_by_image(img_rows)
+
+    console.print(f"[blue]Processing {len(img_boxes)} images containing persons...[/blue]")
+
+    # Label files written after the annotations last changed are already up to date
+    # (e.g. when re-running after a crash); only the rest is formatted and written
+    pending = []
+    for img_row, rows in img_boxes.items():
+        label_file = labels_dir / f"{stems[img_row]}.txt"
+        try:
+            if label_file.stat().st_mtime_ns >= anns_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        pending.append((label_file, rows))
+    
+    if len(pending) < len(img_boxes):
+        console.print(f"[green]Skipping {len(img_boxes) - len(pending)} labels that are already up to date[/green]")
+
+    # Format every label file in one %-operation each; the parent does all the math
+    labels = [
+        (label_file, (LABEL_LINE * len(rows)) % tuple(bboxes[rows].ravel().tolist()))
+        for label_file, rows in pending
+    ]
+    
+    # Writing tens of thousands of small files is bound by per-file open/close latency,
+    # so spread the writes over worker processes; each file is written by exactly one
+    chunks = [labels[i:i + WRITE_CHUNK_SIZE] for i in range(0, len(labels), WRITE_CHUNK_SIZE)]
+    count = 0
+    with _progress() as progress, ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        task = progress.add_task("Converting...", total=len(labels))
+        # One progress update per written chunk, counted in label files
+        for written in executor.map(_write_labels, chunks):
+            count += written
+            progress.update(task, advance=written)
 
     console.print(f"[bold green]Successfully converted {count} labels![/bold green]")
 
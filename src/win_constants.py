@@ -1,2 +0,0 @@
-IMG = r"F:\Soft\AIML\Data\COCO_TD\train2017\train2017"
-ANNOTATIONS_PATH = r"F:\Soft\AIML\Data\COCO_TD\annotations_trainval2017\annotations\instances_train2017.json"
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Tests for the shared COCO helpers in src.coco.
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+from src.coco import annotation_arrays, atomic_write, group_by_image, image_rows, load_coco
+
+
+class LoadCocoTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.json_path = Path(self._tmp.name) / "instances.json"
+        self.pkl_path = self.json_path.with_suffix('.pkl')
+        self.data = {'images': [{'id': 1}], 'annotations': [], 'categories': []}
+        self.json_path.write_bytes(orjson.dumps(self.data))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _set_mtime(self, path, seconds):
+        os.utime(path, (seconds, seconds))
+
+    def test_first_load_parses_json_and_writes_sidecar(self):
+        self.assertEqual(load_coco(self.json_path), self.data)
+        self.assertTrue(self.pkl_path.exists())
+        self.assertEqual(list(self.pkl_path.parent.glob('*.tmp')), [])
+
+    def test_fresh_sidecar_is_used(self):
+        self.pkl_path.write_bytes(pickle.dumps({'from': 'sidecar'}))
+        self._set_mtime(self.json_path, 1_000)
+        self._set_mtime(self.pkl_path, 2_000)
+        self.assertEqual(load_coco(self.json_path), {'from': 'sidecar'})
+
+    def test_stale_sidecar_is_replaced(self):
+        self.pkl_path.write_bytes(pickle.dumps({'from': 'sidecar'}))
+        self._set_mtime(self.pkl_path, 1_000)
+        self._set_mtime(self.json_path, 2_000)
+        self.assertEqual(load_coco(self.json_path), self.data)
+        with open(self.pkl_path, 'rb') as f:
+            self.assertEqual(pickle.load(f), self.data)
+
+
+class AnnotationArraysTest(unittest.TestCase):
+    def test_empty_annotations(self):
+        image_ids, category_ids, bboxes = annotation_arrays([])
+        self.assertEqual(image_ids.shape, (0,))
+        self.assertEqual(category_ids.shape, (0,))
+        self.assertEqual(bboxes.shape, (0, 4))
+
+    def test_rows_follow_annotations(self):
+        annotations = [
+            {'image_id': 7, 'category_id': 1, 'bbox': [1.5, 2.0, 3.0, 4.0]},
+            {'image_id': 3, 'category_id': 18, 'bbox': [0.0, 0.5, 10.0, 20.25]},
+        ]
+        image_ids, category_ids, bboxes = annotation_arrays(annotations, bbox_dtype=np.float64)
+        np.testing.assert_array_equal(image_ids, [7, 3])
+        np.testing.assert_array_equal(category_ids, [1, 18])
+        np.testing.assert_array_equal(bboxes, [[1.5, 2.0, 3.0, 4.0], [0.0, 0.5, 10.0, 20.25]])
+        self.assertEqual(bboxes.dtype, np.float64)
+
+
+class GroupByImageTest(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(group_by_image(np.array([], dtype=np.int32)), {})
+
+    def test_groups_keep_original_order(self):
+        groups = group_by_image(np.array([5, 2, 5, 9, 2, 5], dtype=np.int32))
+        self.assertEqual(sorted(groups), [2, 5, 9])
+        np.testing.assert_array_equal(groups[2], [1, 4])
+        np.testing.assert_array_equal(groups[5], [0, 2, 5])
+        np.testing.assert_array_equal(groups[9], [3])
+
+
+class ImageRowsTest(unittest.TestCase):
+    def test_rows_and_unknown_images(self):
+        rows, known = image_rows(np.array([30, 10, 20]), np.array([20, 30, 99, 10, 5]))
+        np.testing.assert_array_equal(known, [True, True, False, True, False])
+        np.testing.assert_array_equal(rows[known], [2, 0, 1])
+
+    def test_no_images(self):
+        rows, known = image_rows(np.array([], dtype=np.int64), np.array([1, 2]))
+        self.assertEqual(rows.shape, (2,))
+        self.assertFalse(known.any())
+
+
+class AtomicWriteTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "out.txt"
+        self.path.write_bytes(b"old")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_success_replaces_file(self):
+        with atomic_write(self.path) as tmp_path:
+            tmp_path.write_bytes(b"new")
+            self.assertEqual(self.path.read_bytes(), b"old")
+        self.assertEqual(self.path.read_bytes(), b"new")
+        self.assertEqual(list(self.path.parent.glob('*.tmp')), [])
+
+    def test_failure_keeps_old_file_and_removes_temp(self):
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path) as tmp_path:
+                tmp_path.write_bytes(b"partial")
+                raise RuntimeError("interrupted")
+        self.assertEqual(self.path.read_bytes(), b"old")
+        self.assertEqual(list(self.path.parent.glob('*.tmp')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the COCO -> YOLO label conversion in src.prepare_data.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import orjson
+
+import src.prepare_data as prepare_data
+
+
+def _reference_labels(data):
+    """Label file contents as written by the original per-box f-string loop."""
+    images = {img['id']: img for img in data['images']}
+    person_id = next(cat['id'] for cat in data['categories'] if cat['name'] == 'person')
+    labels = {}
+    for ann in data['annotations']:
+        img_info = images.get(ann['image_id'])
+        if ann['category_id'] != person_id or img_info is None:
+            continue
+        img_w, img_h = img_info['width'], img_info['height']
+        bbox = ann['bbox']
+        x_center = (bbox[0] + bbox[2] / 2) / img_w
+        y_center = (bbox[1] + bbox[3] / 2) / img_h
+        width = bbox[2] / img_w
+        height = bbox[3] / img_h
+        name = f"{Path(img_info['file_name']).stem}.txt"
+        labels[name] = labels.get(name, '') + f"0 {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n"
+    return {name: text.encode() for name, text in labels.items()}
+
+
+class ConvertCocoToYoloTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        self.data = {
+            'images': [
+                {'id': 1, 'file_name': '000000000001.jpg', 'width': 640, 'height': 480},
+                {'id': 2, 'file_name': '000000000002.jpg', 'width': 427, 'height': 640},
+                {'id': 3, 'file_name': '000000000003.jpg', 'width': 500, 'height': 333},
+            ],
+            'annotations': [
+                {'image_id': 1, 'category_id': 1, 'bbox': [10.5, 20.25, 100.0, 200.75]},
+                {'image_id': 2, 'category_id': 18, 'bbox': [0.0, 0.0, 5.0, 5.0]},   # dog
+                {'image_id': 2, 'category_id': 1, 'bbox': [1.0, 2.0, 3.0, 4.0]},
+                {'image_id': 1, 'category_id': 1, 'bbox': [33.33, 66.67, 0.01, 412.97]},
+                {'image_id': 9, 'category_id': 1, 'bbox': [1.0, 1.0, 1.0, 1.0]},    # unknown image
+                {'image_id': 2, 'category_id': 1, 'bbox': [426.99, 639.99, 0.01, 0.01]},
+                {'image_id': 3, 'category_id': 18, 'bbox': [1.0, 1.0, 1.0, 1.0]},   # no persons
+            ],
+            'categories': [{'id': 1, 'name': 'person'}, {'id': 18, 'name': 'dog'}],
+        }
+        self.annotations_path = tmp / "instances.json"
+        self.annotations_path.write_bytes(orjson.dumps(self.data))
+        os.utime(self.annotations_path, (1_000, 1_000))
+        self.labels_dir = tmp / "root" / "COCO_TD/train2017/labels"
+
+        patches = [
+            mock.patch.object(prepare_data, 'ANNOTATIONS_PATH', self.annotations_path),
+            mock.patch.object(prepare_data, 'DATA_ROOT', tmp / "root"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _convert(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            prepare_data.convert_coco_to_yolo()
+
+    def _labels(self):
+        return {f.name: f.read_bytes() for f in self.labels_dir.glob('*.txt')}
+
+    def test_labels_match_per_box_formatting(self):
+        self._convert()
+        self.assertEqual(self._labels(), _reference_labels(self.data))
+        self.assertEqual(list(self.labels_dir.glob('*.tmp')), [])
+
+    def test_fresh_npz_cache_skips_parsing(self):
+        self._convert()
+        for label_file in self.labels_dir.glob('*.txt'):
+            label_file.unlink()
+
+        with mock.patch.object(prepare_data, '_extract_person_boxes') as extract:
+            self._convert()
+        extract.assert_not_called()
+        self.assertEqual(self._labels(), _reference_labels(self.data))
+
+    def test_stale_npz_cache_is_rebuilt(self):
+        self._convert()
+
+        # Move the first box; the edited annotations are newer than every cache and label
+        self.data['annotations'][0]['bbox'] = [0.0, 0.0, 64.0, 48.0]
+        self.annotations_path.write_bytes(orjson.dumps(self.data))
+        later = time.time() + 100
+        os.utime(self.annotations_path, (later, later))
+
+        with mock.patch.object(prepare_data, '_extract_person_boxes',
+                               wraps=prepare_data._extract_person_boxes) as extract:
+            self._convert()
+        extract.assert_called_once()
+        self.assertEqual(self._labels(), _reference_labels(self.data))
+
+    def test_up_to_date_labels_are_skipped(self):
+        self._convert()
+        fresh = self.labels_dir / "000000000001.txt"
+        stale = self.labels_dir / "000000000002.txt"
+
+        # A label newer than the annotations is kept as is; an older one is rewritten
+        fresh.write_bytes(b"kept\n")
+        stale.write_bytes(b"stale\n")
+        os.utime(stale, (500, 500))
+
+        self._convert()
+        expected = _reference_labels(self.data)
+        self.assertEqual(fresh.read_bytes(), b"kept\n")
+        self.assertEqual(stale.read_bytes(), expected[stale.name])
+
+
+if __name__ == '__main__':
+    unittest.main()
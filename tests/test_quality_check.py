@@ -0,0 +1,138 @@
+"""
+Tests for the checks and measurement cache in 03_check_for_false_triggers.py.
+"""
+
+import contextlib
+import importlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from PIL import Image
+
+quality_check = importlib.import_module('src.archive.03_check_for_false_triggers')
+
+
+class FindTooSmallObjectsTest(unittest.TestCase):
+    def test_order_matches_per_image_scan(self):
+        # Images in metadata order 2 then 1; annotations interleaved between them
+        data = {
+            'images': [
+                {'id': 2, 'file_name': 'b.jpg', 'width': 100, 'height': 100},
+                {'id': 1, 'file_name': 'a.jpg', 'width': 100, 'height': 100},
+            ],
+            'annotations': [
+                {'image_id': 1, 'category_id': 1, 'bbox': [0, 0, 10, 10]},  # 1% -> too small
+                {'image_id': 2, 'category_id': 3, 'bbox': [0, 0, 5, 5]},    # too small
+                {'image_id': 2, 'category_id': 1, 'bbox': [0, 0, 50, 50]},  # large enough
+                {'image_id': 9, 'category_id': 1, 'bbox': [0, 0, 1, 1]},    # unknown image
+                {'image_id': 1, 'category_id': 2, 'bbox': [1, 1, 2, 3]},    # too small
+                {'image_id': 2, 'category_id': 4, 'bbox': [0, 0, 14, 14]},  # 1.96% -> too small
+            ],
+        }
+
+        # Same order as checking each image in data['images'] order, then its annotations in order
+        expected = [
+            {'image': 'b.jpg', 'bbox': [0, 0, 5, 5], 'category': 3},
+            {'image': 'b.jpg', 'bbox': [0, 0, 14, 14], 'category': 4},
+            {'image': 'a.jpg', 'bbox': [0, 0, 10, 10], 'category': 1},
+            {'image': 'a.jpg', 'bbox': [1, 1, 2, 3], 'category': 2},
+        ]
+        self.assertEqual(quality_check.find_too_small_objects(data), expected)
+
+    def test_threshold_uses_exact_box_area(self):
+        # 30.53 x 122.83 is just below 2% of 500x375 in float64, but not once the box
+        # is rounded to float32
+        data = {
+            'images': [{'id': 1, 'file_name': 'a.jpg', 'width': 500, 'height': 375}],
+            'annotations': [{'image_id': 1, 'category_id': 1, 'bbox': [0, 0, 30.53, 122.83]}],
+        }
+        self.assertEqual(len(quality_check.find_too_small_objects(data)), 1)
+
+    def test_empty_dataset(self):
+        self.assertEqual(quality_check.find_too_small_objects({'images': [], 'annotations': []}), [])
+
+
+class ProcessSingleImageTest(unittest.TestCase):
+    def test_exif_rotated_image_reports_displayed_size(self):
+        # Stored as 640x480 with Orientation 6 (rotate 90): cv2.imread reads it as 480x640
+        im = Image.fromarray(np.full((480, 640, 3), 128, dtype=np.uint8))
+        exif = im.getexif()
+        exif[0x0112] = 6
+        buf = io.BytesIO()
+        im.save(buf, format='JPEG', exif=exif)
+
+        w, h, _ = quality_check.process_single_image('rotated.jpg', buf.getvalue())
+        self.assertEqual((w, h), (480, 640))
+
+
+class StatsCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        self.image_dir = tmp / "images"
+        self.image_dir.mkdir()
+        self.cache_path = tmp / "cache" / "image_stats.parquet"
+
+        # A bright full-size image and a small mid-grey one
+        Image.fromarray(np.full((480, 640, 3), 200, dtype=np.uint8)).save(self.image_dir / "a.jpg")
+        Image.fromarray(np.full((240, 320, 3), 120, dtype=np.uint8)).save(self.image_dir / "b.jpg")
+        self.data = {
+            'images': [
+                {'id': 1, 'file_name': 'a.jpg', 'width': 640, 'height': 480},
+                {'id': 2, 'file_name': 'b.jpg', 'width': 320, 'height': 240},
+            ],
+            'annotations': [],
+            'categories': [],
+        }
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _check(self, data=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return quality_check.check_data_quality(data or self.data, str(self.image_dir),
+                                                    num_workers=1, cache_path=self.cache_path)
+
+    def _cache(self):
+        return {row['img_path']: row for row in pl.read_parquet(self.cache_path).iter_rows(named=True)}
+
+    def _set_cached_brightness(self, img_path, brightness):
+        df = pl.read_parquet(self.cache_path).with_columns(
+            pl.when(pl.col('img_path') == img_path).then(brightness).otherwise(pl.col('brightness')).alias('brightness'))
+        df.write_parquet(self.cache_path)
+
+    def test_cached_and_uncached_reports_match(self):
+        uncached = self._check()
+        self.assertEqual(uncached['low_resolution'], ['b.jpg'])
+        self.assertEqual(uncached['poor_lighting'], [])
+        self.assertEqual(self._check(), uncached)
+
+    def test_unchanged_files_reuse_cached_measurements(self):
+        self._check()
+        a_path = os.path.join(self.image_dir, 'a.jpg')
+
+        # A cached value is served as is while the file's mtime and size are unchanged
+        self._set_cached_brightness(a_path, 10.0)
+        self.assertEqual(self._check()['poor_lighting'], ['a.jpg'])
+
+        # A new mtime invalidates the entry, so the image is measured again
+        st = os.stat(a_path)
+        os.utime(a_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(self._check()['poor_lighting'], [])
+        self.assertEqual(self._cache()[a_path]['mtime_ns'], os.stat(a_path).st_mtime_ns)
+
+    def test_entries_for_unseen_images_are_pruned(self):
+        self._check()
+        self.assertEqual(len(self._cache()), 2)
+
+        self._check({**self.data, 'images': self.data['images'][:1]})
+        self.assertEqual(list(self._cache()), [os.path.join(self.image_dir, 'a.jpg')])
+
+
+if __name__ == '__main__':
+    unittest.main()